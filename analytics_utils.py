@@ -3,6 +3,7 @@ import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score
 from scipy import stats
+from quantile_utils import quantile_bin_stats
 
 def calculate_infection_rate(cases, population):
     """Calculate infection rate per 100,000 people"""
@@ -45,31 +46,26 @@ def calculate_risk_score(row):
     
     return min(max(risk_score * 100, 0), 100)  # Scale to 0-100
 
-def analyze_vaccination_impact(data):
-    """Analyze the impact of vaccination rates on cases and deaths"""
-    if 'Vaccination Rate' not in data.columns:
+def analyze_vaccination_impact(data, bins=4, labels=None):
+    """
+    Analyze the impact of vaccination rates on cases and deaths
+    `data` may be a DataFrame or an iterable of chunks that all carry the
+    columns of the first one; it is never modified
+    """
+    if isinstance(data, pd.DataFrame) and 'Vaccination Rate' not in data.columns:
         return None
     
-    # Calculate correlation between vaccination rate and new cases
-    vax_case_corr = data['Vaccination Rate'].corr(data['New cases'])
-    
-    # Calculate correlation between vaccination rate and deaths
-    vax_death_corr = data['Vaccination Rate'].corr(data['Deaths'])
-    
-    # Group countries by vaccination rate quartiles
-    data['Vax_Quartile'] = pd.qcut(data['Vaccination Rate'], q=4, labels=['Low', 'Medium-Low', 'Medium-High', 'High'])
-    
-    # Calculate average metrics by quartile
-    quartile_stats = data.groupby('Vax_Quartile').agg({
-        'New cases': 'mean',
-        'Deaths': 'mean',
-        'Recovery Rate': 'mean'
-    }).round(2)
+    # Group countries by vaccination rate quantiles and correlate in one pass;
+    # metrics missing from the data (or its first chunk) are skipped
+    binned = quantile_bin_stats(data, 'Vaccination Rate', ['New cases', 'Deaths', 'Recovery Rate'],
+                                bins=bins, labels=labels, correlate=['New cases', 'Deaths'])
     
     return {
-        'vaccination_case_correlation': vax_case_corr,
-        'vaccination_death_correlation': vax_death_corr,
-        'quartile_statistics': quartile_stats.to_dict()
+        'vaccination_case_correlation': binned['correlations'].get('New cases'),
+        'vaccination_death_correlation': binned['correlations'].get('Deaths'),
+        'quartile_statistics': binned['statistics'],
+        'bin_edges': binned['edges'],
+        'method': binned['method']
     }
 
 def perform_trend_analysis(data, window=7):
@@ -97,7 +93,7 @@ def perform_trend_analysis(data, window=7):
 
 def calculate_regional_metrics(data):
     """Calculate advanced metrics by region"""
-    regional_metrics = data.groupby('WHO Region').agg({
+    regional_metrics = data.groupby('WHO Region', observed=True).agg({
         'Confirmed': ['sum', 'mean', 'std'],
         'Deaths': ['sum', 'mean', 'std'],
         'Recovered': ['sum', 'mean', 'std'],
@@ -0,0 +1,196 @@
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Scales a MAD to a standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+
+# Upper bound on region x date x window cells materialised at once
+MAX_WINDOW_CELLS = 4000000
+
+def rolling_robust_zscores(values, prior, window):
+    """
+    Robust z-scores of each new value against the median/MAD of the `window`
+    values before it, for every region at once
+
+    `values` holds the new days (regions x days) and `prior` the days already
+    seen. Returns (z, excess) where excess is the distance from the median.
+    """
+    n_regions, n_days = values.shape
+    prior = prior[:, -window:]
+    padding = np.full((n_regions, window - prior.shape[1]), np.nan)
+    context = np.concatenate([padding, prior, values], axis=1)
+
+    medians = np.empty((n_regions, n_days))
+    mads = np.empty((n_regions, n_days))
+    counts = np.empty((n_regions, n_days))
+    block = max(1, MAX_WINDOW_CELLS // max(1, n_days * window))
+
+    # Window i spans the `window` days before new day i
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for start in range(0, n_regions, block):
+            rows = slice(start, start + block)
+            windows = sliding_window_view(context[rows], window, axis=1)[:, :n_days, :]
+            complete = np.isfinite(windows)
+            # np.median is much faster than np.nanmedian when there is nothing to skip
+            median = np.median if complete.all() else np.nanmedian
+            medians[rows] = median(windows, axis=2)
+            mads[rows] = median(np.abs(windows - medians[rows][:, :, None]), axis=2)
+            counts[rows] = complete.sum(axis=2)
+
+    excess = values - medians
+    scale = MAD_SCALE * mads
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, excess / scale, np.where(excess == 0, 0.0, np.sign(excess) * np.inf))
+
+    # Need at least half a window of history to judge a value
+    z = np.where((counts >= window // 2) & np.isfinite(values), z, np.nan)
+    return z, excess
+
+def cusum(z, positive, negative, drift=1.0, threshold=8.0, clip=3.0):
+    """
+    Two-sided CUSUM over standardised residuals, stepping through days with
+    all regions updated together. Sums reset after each detected change.
+    Returns (shift_up, shift_down, positive, negative).
+    """
+    residuals = np.clip(np.nan_to_num(z, nan=0.0), -clip, clip)
+    shift_up = np.zeros(z.shape, dtype=bool)
+    shift_down = np.zeros(z.shape, dtype=bool)
+    positive, negative = positive.copy(), negative.copy()
+
+    for day in range(z.shape[1]):
+        positive = np.maximum(0.0, positive + residuals[:, day] - drift)
+        negative = np.maximum(0.0, negative - residuals[:, day] - drift)
+        shift_up[:, day] = positive > threshold
+        shift_down[:, day] = negative > threshold
+        positive[shift_up[:, day]] = 0.0
+        negative[shift_down[:, day]] = 0.0
+
+    return shift_up, shift_down, positive, negative
+
+class AnomalyDetector:
+    """
+    Reporting spike and trend break detection on daily series derived from
+    cumulative counts, for all regions at once. The detector keeps the last
+    `window` days and the CUSUM sums, so new days can be scanned incrementally.
+    """
+
+    def __init__(self, window=28, threshold=5.0, min_excess=5, cusum_drift=1.0,
+                 cusum_threshold=8.0, cusum_clip=3.0):
+        # A MAD needs a few values before it stops collapsing to zero
+        if window < 3:
+            raise ValueError('window must be at least 3')
+        if threshold <= 0 or cusum_threshold <= 0 or cusum_clip <= 0:
+            raise ValueError('thresholds must be positive')
+        if min_excess < 0 or cusum_drift < 0:
+            raise ValueError('min_excess and cusum_drift must not be negative')
+        self.window = window
+        self.threshold = threshold
+        self.min_excess = min_excess
+        self.cusum_drift = cusum_drift
+        self.cusum_threshold = cusum_threshold
+        self.cusum_clip = cusum_clip
+        self.regions = None
+        self._lock = threading.Lock()
+
+    @property
+    def last_date(self):
+        """Latest day scanned for any region"""
+        if self.regions is None:
+            return None
+        scanned = self._last_dates[~np.isnat(self._last_dates)]
+        return pd.Timestamp(scanned.max()) if len(scanned) else None
+
+    def fit(self, regions, dates, cumulative):
+        """Reset state and scan a full history"""
+        with self._lock:
+            n_regions = len(regions)
+            self.regions = list(regions)
+            self._positions = {region: i for i, region in enumerate(self.regions)}
+            self._last_dates = np.full(n_regions, np.datetime64('NaT'), dtype='datetime64[ns]')
+            self._last_cumulative = np.full(n_regions, np.nan)
+            self._history = np.full((n_regions, self.window), np.nan)
+            self._positive = np.zeros(n_regions)
+            self._negative = np.zeros(n_regions)
+        return self.update(dates, cumulative)
+
+    def update(self, dates, cumulative, regions=None):
+        """
+        Scan only the days after the last one seen and return their flags
+        Each region keeps its own position, so `regions` may be any subset
+        """
+        with self._lock:
+            if self.regions is None:
+                raise ValueError('Detector has not been fitted')
+
+            dates = pd.DatetimeIndex(dates)
+            cumulative = np.asarray(cumulative, dtype='float64')
+            if regions is None:
+                positions = np.arange(len(self.regions))
+            else:
+                unknown = sorted(set(regions) - set(self._positions))
+                if unknown:
+                    raise ValueError(f'Unknown regions for an incremental update: {unknown}')
+                positions = np.array([self._positions[region] for region in regions], dtype=int)
+            if cumulative.shape != (len(positions), len(dates)):
+                raise ValueError('cumulative must be a regions x dates matrix')
+
+            # Regions that were last scanned on the same day share one pass
+            flags = []
+            last_dates = self._last_dates[positions]
+            keys = last_dates.view('int64')
+            for key in np.unique(keys):
+                group = keys == key
+                last_date = last_dates[group][0]
+                new_days = np.ones(len(dates), dtype=bool) if np.isnat(last_date) else dates > last_date
+                if new_days.any():
+                    flags.extend(self._scan(positions[group], dates[new_days], cumulative[group][:, new_days]))
+
+            flags.sort(key=lambda flag: (flag['date'], self._positions[flag['region']]))
+            return flags
+
+    def _scan(self, positions, dates, cumulative):
+        """Scan new days for a set of regions and advance their state"""
+        # Daily counts keep negative corrections; they are anomalies too
+        daily = np.diff(np.concatenate([self._last_cumulative[positions, None], cumulative], axis=1), axis=1)
+
+        z, excess = rolling_robust_zscores(daily, self._history[positions], self.window)
+        spikes = (np.abs(z) > self.threshold) & (np.abs(excess) >= self.min_excess)
+        shift_up, shift_down, positive, negative = cusum(
+            z, self._positive[positions], self._negative[positions],
+            self.cusum_drift, self.cusum_threshold, self.cusum_clip
+        )
+
+        self._positive[positions] = positive
+        self._negative[positions] = negative
+        self._history[positions] = np.concatenate([self._history[positions], daily], axis=1)[:, -self.window:]
+        self._last_cumulative[positions] = cumulative[:, -1]
+        self._last_dates[positions] = dates[-1].to_datetime64()
+
+        return self._flags(positions, dates, daily, z, excess, spikes, shift_up, shift_down)
+
+    def _flags(self, positions, dates, daily, z, excess, spikes, shift_up, shift_down):
+        """Flagged (region, date) pairs ordered by date"""
+        # A trend break outranks a spike on the same day
+        kinds = np.full(z.shape, '', dtype=object)
+        kinds[spikes & (excess < 0)] = 'drop'
+        kinds[spikes & (excess > 0)] = 'spike'
+        kinds[shift_down] = 'shift_down'
+        kinds[shift_up] = 'shift_up'
+
+        day_index, region_index = np.nonzero((kinds != '').T)
+        return [
+            {
+                'region': self.regions[positions[r]],
+                'date': dates[d].strftime('%Y-%m-%d'),
+                'type': kinds[r, d],
+                'value': float(daily[r, d]),
+                'expected': float(daily[r, d] - excess[r, d]) if np.isfinite(excess[r, d]) else None,
+                'score': None if np.isnan(z[r, d]) else float(np.clip(z[r, d], -1e6, 1e6))
+            }
+            for d, r in zip(day_index, region_index)
+        ]
@@ -5,111 +5,447 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from prophet import Prophet
 import plotly.express as px
 import json
+import threading
+from collections import namedtuple
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from schema_utils import optimize_schema, memory_report
+from coalescing_utils import SingleFlight, make_request_key
+from metrics_utils import to_region_date_array, compute_epi_metrics, to_json_values
+from backtest_utils import ENGINES, backtest, summarize_backtest, choose_engine
+from query_utils import build_dimension_indexes, run_query, iter_query
+from hierarchy_utils import RegionHierarchy, UNASSIGNED
+from pipeline_utils import PipelineTask, PrecomputePipeline
+from anomaly_utils import AnomalyDetector
+from streaming_utils import stream_format, stream_response, iter_batches
+from visualization_utils import (
+    create_regional_comparison,
+    create_vaccination_impact_dashboard,
+    create_top_affected_countries_table
+)
 
 app = Flask(__name__)
 CORS(app)
 
+# The uploaded data and everything derived from it, published together so a
+# request never mixes artifacts from two uploads
+DatasetState = namedtuple('DatasetState', ['data', 'version', 'memory', 'indexes', 'hierarchy'])
+
 # Global variable to store the data
-covid_data = None
+covid_dataset = None
+covid_dataset_lock = threading.Lock()
+
+# Anomaly detectors per metric, kept so new days can be scanned incrementally
+anomaly_detectors = {}
+
+# Shared in-flight computations for identical concurrent requests
+expensive_flights = SingleFlight()
+
+# Derived artifacts computed in the background after each upload
+precompute_pipeline = PrecomputePipeline(expensive_flights)
+PRECOMPUTE_TOP_COUNTRIES = 5
+PRECOMPUTE_FORECAST_DAYS = 30
+
+# Rows or members per streamed event, and concurrent fits for streamed forecasts
+STREAM_BATCH_SIZE = 1000
+STREAM_FORECAST_WORKERS = 4
+
+# Figures published by the precompute pipeline
+FIGURES = {
+    'regional_comparison': create_regional_comparison,
+    'vaccination_impact': create_vaccination_impact_dashboard,
+    'top_affected_countries': create_top_affected_countries_table
+}
 
 def load_and_process_data(data):
-    """Load and process the CSV data"""
+    """Load and process the CSV data; returns the frame and its memory report"""
     df = pd.DataFrame(data)
     
     # Convert columns to numeric
     numeric_columns = ['Confirmed', 'Deaths', 'Recovered', 'Active', 
                       'New cases', 'New deaths', 'New recovered']
     for col in numeric_columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    # Switch to the compact schema and keep a memory report for the dataset
+    optimized = optimize_schema(df)
     
-    return df
+    return optimized, memory_report(optimized, baseline=df)
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_data():
-    """Analyze uploaded COVID-19 data"""
-    global covid_data
+    """
+    Analyze uploaded COVID-19 data
+    Optional query args: `level` picks the hierarchy level for the regional
+    analysis, `path` (repeatable) scopes statistics to one node and its children
+    """
+    global covid_dataset
     
+    # Build every derived artifact before anything is published
     data = request.json
-    df = load_and_process_data(data)
-    covid_data = df
+    df, memory = load_and_process_data(data)
+    indexes = build_dimension_indexes(df)
+    hierarchy = RegionHierarchy(df)
+    
+    with covid_dataset_lock:
+        version = covid_dataset.version + 1 if covid_dataset is not None else 1
+        covid_dataset = DatasetState(df, version, memory, indexes, hierarchy)
+        start_precompute(df, hierarchy, version)
+    
+    level = request.args.get('level', 'WHO Region')
+    path = request.args.getlist('path')
+    summary_metrics = ['Confirmed', 'Deaths', 'Recovered', 'Active']
+    
+    try:
+        totals = hierarchy.node(path)
+        if path:
+            regions = hierarchy.children(path)
+        else:
+            # Like a plain groupby, the top-level breakdown leaves out rows
+            # without a value for the level
+            regions = hierarchy.rollup(level)
+            regions = regions[regions.index.get_level_values(level) != UNASSIGNED]
+    except ValueError as e:
+        return jsonify({'error': str(e)})
     
     # Basic statistics
     stats = {
-        'total_cases': int(df['Confirmed'].sum()),
-        'total_deaths': int(df['Deaths'].sum()),
-        'total_recovered': int(df['Recovered'].sum()),
-        'total_active': int(df['Active'].sum()),
-        'mortality_rate': float((df['Deaths'].sum() / df['Confirmed'].sum()) * 100),
-        'recovery_rate': float((df['Recovered'].sum() / df['Confirmed'].sum()) * 100)
+        'total_cases': int(totals['Confirmed']),
+        'total_deaths': int(totals['Deaths']),
+        'total_recovered': int(totals['Recovered']),
+        'total_active': int(totals['Active']),
+        'mortality_rate': float((totals['Deaths'] / totals['Confirmed']) * 100),
+        'recovery_rate': float((totals['Recovered'] / totals['Confirmed']) * 100)
     }
     
-    # Country rankings
-    top_countries = df.nlargest(10, 'Confirmed')[['Country/Region', 'Confirmed', 'Deaths', 'Recovered']]
+    # Country rankings, from the country rollup when rows are sub-national
+    if hierarchy.levels[-1] == 'Country/Region':
+        countries = df
+    else:
+        countries = hierarchy.rollup('Country/Region').reset_index()
+    top_countries = countries.nlargest(10, 'Confirmed')[['Country/Region', 'Confirmed', 'Deaths', 'Recovered']]
     rankings = top_countries.to_dict('records')
     
-    # Regional analysis
-    regional_stats = df.groupby('WHO Region').agg({
-        'Confirmed': 'sum',
-        'Deaths': 'sum',
-        'Recovered': 'sum',
-        'Active': 'sum'
-    }).to_dict('index')
+    # Regional analysis from the precomputed rollup
+    regional_stats = hierarchy.to_dict(regions, summary_metrics)
     
     return jsonify({
         'statistics': stats,
         'rankings': rankings,
-        'regional_analysis': regional_stats
+        'regional_analysis': regional_stats,
+        'memory_report': memory
+    })
+
+@app.route('/api/query', methods=['POST'])
+def query_data():
+    """Return only the requested columns and rows of the uploaded data"""
+    dataset = covid_dataset
+    if dataset is None:
+        return jsonify({'error': 'No data available'})
+    
+    fmt = stream_format(request)
+    if fmt:
+        return stream_response(iter_query(dataset.data, request.json or {}, dataset.indexes,
+                                          STREAM_BATCH_SIZE), fmt)
+    
+    try:
+        result = run_query(dataset.data, request.json or {}, dataset.indexes)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    
+    return jsonify(result)
+
+def start_precompute(data, hierarchy, version):
+    """Schedule derived artifacts for a freshly uploaded dataset in priority order"""
+    tasks = [
+        PipelineTask('regional_aggregates', make_request_key('regional', version),
+                     compute_regional_aggregates, (hierarchy,), priority=0),
+        PipelineTask('correlations', make_request_key('correlations', version),
+                     compute_correlations, (data,), priority=1),
+        PipelineTask('trends', make_request_key('trends', version),
+                     compute_trends, (data,), priority=1),
+        PipelineTask('clusters', make_request_key('cluster', version),
+                     compute_clusters, (data,), priority=2)
+    ]
+    
+    # Forecasts for the most affected countries, keyed like /api/forecast requests
+    if 'Country/Region' in hierarchy.levels:
+        top_countries = (hierarchy.rollup('Country/Region')
+                         .nlargest(PRECOMPUTE_TOP_COUNTRIES, 'Confirmed')
+                         .index.get_level_values('Country/Region'))
+        for country in top_countries:
+            params = {'country': str(country), 'days': PRECOMPUTE_FORECAST_DAYS, 'engine': 'prophet'}
+            tasks.append(PipelineTask(f'forecast:{country}', make_request_key('forecast', version, params),
+                                      compute_forecast, (data, str(country), PRECOMPUTE_FORECAST_DAYS),
+                                      priority=3))
+    
+    # The regional comparison draws on the published rollups; the other
+    # figures only need the data
+    for name in FIGURES:
+        deps = ['regional_aggregates'] if name == 'regional_comparison' else []
+        tasks.append(PipelineTask(f'figure:{name}', make_request_key('figure', version, {'name': name}),
+                                  compute_figure, (name, data, hierarchy, version), deps=deps, priority=4))
+    
+    precompute_pipeline.start(version, tasks)
+
+def compute_regional_aggregates(hierarchy):
+    """Rollups for every hierarchy level"""
+    return {level: hierarchy.to_dict(hierarchy.rollup(level)) for level in hierarchy.levels}
+
+def compute_figure(name, data, hierarchy, version):
+    """Build a dashboard figure and return its plotly JSON"""
+    if name == 'regional_comparison' and 'WHO Region' in hierarchy.levels:
+        key = make_request_key('regional', version)
+        aggregates = precompute_pipeline.fetch(version, key, compute_regional_aggregates, hierarchy)
+        regional_totals = {region: totals for region, totals in aggregates['WHO Region'].items()
+                           if region != UNASSIGNED}
+        fig = create_regional_comparison(data, regional_totals)
+    else:
+        fig = FIGURES[name](data)
+    return None if fig is None else json.loads(fig.to_json())
+
+@app.route('/api/pipeline', methods=['GET'])
+def pipeline_status():
+    """Progress of the background precompute for the current dataset"""
+    return jsonify(precompute_pipeline.status())
+
+@app.route('/api/regional', methods=['GET'])
+def regional_aggregates():
+    """Regional rollups for every hierarchy level"""
+    dataset = covid_dataset
+    if dataset is None:
+        return jsonify({'error': 'No data available'})
+    
+    key = make_request_key('regional', dataset.version)
+    return jsonify(precompute_pipeline.fetch(dataset.version, key, compute_regional_aggregates,
+                                             dataset.hierarchy))
+
+@app.route('/api/figures/<name>', methods=['GET'])
+def dashboard_figure(name):
+    """Plotly JSON for a dashboard figure"""
+    dataset = covid_dataset
+    if dataset is None:
+        return jsonify({'error': 'No data available'})
+    
+    if name not in FIGURES:
+        return jsonify({'error': f'Unknown figure: {name}'})
+    
+    key = make_request_key('figure', dataset.version, {'name': name})
+    return jsonify({'figure': precompute_pipeline.fetch(dataset.version, key, compute_figure, name,
+                                                        dataset.data, dataset.hierarchy, dataset.version)})
+
+@app.route('/api/hierarchy', methods=['POST'])
+def hierarchy_node():
+    """Drill down or roll up the region hierarchy using precomputed nodes"""
+    dataset = covid_dataset
+    if dataset is None:
+        return jsonify({'error': 'No data available'})
+    
+    hierarchy = dataset.hierarchy
+    path = request.json.get('path', [])
+    if isinstance(path, str):
+        path = [path]
+    if not isinstance(path, list):
+        return jsonify({'error': 'path must be a list of region names'})
+    
+    try:
+        node = hierarchy.node_dict(path)
+        children = hierarchy.children(path)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    
+    levels = hierarchy.levels
+    return jsonify({
+        'levels': levels,
+        'path': path,
+        'level': levels[len(path) - 1] if path else None,
+        'node': node,
+        'parent': list(hierarchy.parent(path)) if path else None,
+        'children': hierarchy.to_dict(children)
     })
 
 @app.route('/api/forecast', methods=['POST'])
 def forecast_cases():
-    """Generate forecasts using Prophet"""
+    """
+    Generate forecasts using Prophet or a cheaper engine
+    Pass `countries` instead of `country` for several countries; with a
+    streaming format each forecast is emitted as soon as its fit finishes
+    """
     country = request.json.get('country')
+    countries = request.json.get('countries')
     days = int(request.json.get('days', 30))
+    engine = request.json.get('engine', 'prophet')
     
-    if covid_data is None:
+    dataset = covid_dataset
+    if dataset is None:
         return jsonify({'error': 'No data available'})
     
-    # Filter data for the country
-    country_data = covid_data[covid_data['Country/Region'] == country]
+    if engine not in ENGINES:
+        return jsonify({'error': f'Unknown forecast engine: {engine}'})
     
-    # Prepare data for Prophet
-    df_prophet = pd.DataFrame({
-        'ds': pd.date_range(start=datetime.now(), periods=len(country_data)),
-        'y': country_data['Confirmed'].values
-    })
+    data, version = dataset.data, dataset.version
+    
+    def fetch_forecast(name):
+        key = make_request_key('forecast', version, {'country': name, 'days': days, 'engine': engine})
+        return precompute_pipeline.fetch(version, key, compute_forecast, data, name, days, engine)
+    
+    if countries is None:
+        return jsonify(fetch_forecast(country))
     
-    # Create and fit Prophet model
-    model = Prophet(yearly_seasonality=True, weekly_seasonality=True)
-    model.fit(df_prophet)
+    fmt = stream_format(request)
+    if fmt:
+        events = (('forecast', {'country': name, 'result': payload})
+                  for name, payload in iter_forecasts(fetch_forecast, countries))
+        return stream_response(events, fmt)
     
-    # Make future predictions
-    future = model.make_future_dataframe(periods=days)
-    forecast = model.predict(future)
+    return jsonify({name: payload for name, payload in iter_forecasts(fetch_forecast, countries)})
+
+def iter_forecasts(fetch_forecast, countries):
+    """
+    Yield (country, forecast) pairs in completion order; failures yield an error payload
+    If the consumer stops early (e.g. a streaming client disconnects), queued
+    fits are cancelled and the generator returns without waiting for running ones
+    """
+    executor = ThreadPoolExecutor(max_workers=STREAM_FORECAST_WORKERS)
+    futures = {executor.submit(fetch_forecast, name): name for name in countries}
+    try:
+        for future in as_completed(futures):
+            try:
+                payload = future.result()
+            except Exception as e:
+                payload = {'error': str(e)}
+            yield futures[future], payload
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def compute_forecast(data, country, days, engine='prophet'):
+    """Fit a forecast engine for one country and return the forecast payload"""
+    # Filter data for the country
+    country_data = data[data['Country/Region'] == country]
+    
+    # Prepare the history series
+    history = pd.Series(
+        country_data['Confirmed'].astype('float64').values,
+        index=pd.date_range(start=datetime.now(), periods=len(country_data))
+    )
+    
+    # Fit the model and make future predictions
+    yhat, lower, upper = ENGINES[engine](history, days)
+    future_dates = pd.date_range(start=history.index[-1], periods=days + 1)[1:]
     
     # Prepare response
     forecast_data = {
-        'dates': forecast['ds'].tail(days).dt.strftime('%Y-%m-%d').tolist(),
-        'predictions': forecast['yhat'].tail(days).round().astype(int).tolist(),
-        'lower_bound': forecast['yhat_lower'].tail(days).round().astype(int).tolist(),
-        'upper_bound': forecast['yhat_upper'].tail(days).round().astype(int).tolist()
+        'dates': future_dates.strftime('%Y-%m-%d').tolist(),
+        'predictions': np.round(yhat).astype(int).tolist(),
+        'lower_bound': np.round(lower).astype(int).tolist(),
+        'upper_bound': np.round(upper).astype(int).tolist()
+    }
+    
+    return forecast_data
+
+@app.route('/api/backtest', methods=['POST'])
+def backtest_forecasts():
+    """Rolling-origin backtest of forecast engines per country and horizon"""
+    records = request.json.get('data')
+    countries = request.json.get('countries')
+    horizons = request.json.get('horizons', [7, 14])
+    engines = request.json.get('engines', list(ENGINES))
+    initial = int(request.json.get('initial', 30))
+    period = int(request.json.get('period', 7))
+    max_mape = float(request.json.get('max_mape', 10))
+    max_workers = request.json.get('max_workers')
+    
+    if not records:
+        return jsonify({'error': 'No time series data available'})
+    
+    if not isinstance(horizons, list):
+        return jsonify({'error': 'horizons must be a list of integers'})
+    try:
+        horizons = sorted({int(horizon) for horizon in horizons})
+        max_workers = int(max_workers) if max_workers is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'horizons and max_workers must be integers'})
+    if not horizons or horizons[0] < 1:
+        return jsonify({'error': 'horizons must contain at least one positive integer'})
+    if initial < 2:
+        return jsonify({'error': 'initial must be at least 2'})
+    if period < 1:
+        return jsonify({'error': 'period must be at least 1'})
+    if not isinstance(engines, list):
+        return jsonify({'error': 'engines must be a list of engine names'})
+    
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        return jsonify({'error': f'Unknown forecast engines: {unknown}'})
+    
+    series = pd.DataFrame(records)
+    if countries:
+        series = series[series['Country/Region'].isin(countries)]
+    
+    regions, dates, cumulative = to_region_date_array(series)
+    series_by_country = {
+        region: pd.Series(cumulative[i], index=dates) for i, region in enumerate(regions)
     }
     
-    return jsonify(forecast_data)
+    outcome = backtest(series_by_country, horizons, engines, initial, period, max_workers)
+    summary = summarize_backtest(outcome['results'])
+    
+    by_country = pd.DataFrame()
+    if not outcome['results'].empty:
+        by_country = outcome['results'].groupby(['country', 'engine', 'horizon']).agg({
+            'mae': 'mean',
+            'mape': 'mean',
+            'coverage': 'mean'
+        }).round(4).reset_index()
+    
+    return jsonify({
+        'summary': summary.reset_index().to_dict('records'),
+        'by_country': by_country.to_dict('records'),
+        'recommended_engine': {
+            horizon: choose_engine(summary, horizon, max_mape) for horizon in horizons
+        },
+        'fits': outcome['fits'],
+        'failed_fits': outcome['failed_fits'],
+        'cache_hits': outcome['cache_hits']
+    })
 
 @app.route('/api/cluster', methods=['POST'])
 def cluster_analysis():
     """Perform clustering analysis on countries"""
-    if covid_data is None:
+    dataset = covid_dataset
+    if dataset is None:
         return jsonify({'error': 'No data available'})
     
+    key = make_request_key('cluster', dataset.version)
+    result = precompute_pipeline.fetch(dataset.version, key, compute_clusters, dataset.data)
+    
+    # Full membership lists are only sent when streaming
+    fmt = stream_format(request)
+    if fmt:
+        return stream_response(iter_cluster_events(result), fmt)
+    
+    return jsonify({
+        'cluster_statistics': result['cluster_statistics'],
+        'cluster_representatives': result['cluster_representatives']
+    })
+
+def iter_cluster_events(result):
+    """Cluster statistics first, then every cluster's members in batches"""
+    yield 'statistics', result['cluster_statistics']
+    for cluster, members in result['cluster_members'].items():
+        for batch in iter_batches(members, STREAM_BATCH_SIZE):
+            yield 'members', {'cluster': cluster, 'countries': batch}
+
+def compute_clusters(data):
+    """Fit KMeans on the country metrics and return the cluster payload"""
     # Prepare features for clustering
     features = ['Confirmed', 'Deaths', 'Recovered', 'Active']
-    X = covid_data[features].values
+    X = data[features].astype('float64').values
     
     # Normalize the features
     scaler = StandardScaler()
@@ -120,9 +456,9 @@ def cluster_analysis():
     kmeans = KMeans(n_clusters=n_clusters, random_state=42)
     clusters = kmeans.fit_predict(X_scaled)
     
-    # Prepare results
-    covid_data['Cluster'] = clusters
-    cluster_stats = covid_data.groupby('Cluster').agg({
+    # Prepare results on a copy so the shared frame is not mutated
+    data = data.assign(Cluster=clusters)
+    cluster_stats = data.groupby('Cluster').agg({
         'Country/Region': 'count',
         'Confirmed': 'mean',
         'Deaths': 'mean',
@@ -130,25 +466,163 @@ def cluster_analysis():
         'Active': 'mean'
     }).round(2).to_dict('index')
     
-    # Get representative countries for each cluster
+    # Get member and representative countries for each cluster
+    cluster_members = {}
     cluster_representatives = {}
     for i in range(n_clusters):
-        cluster_countries = covid_data[covid_data['Cluster'] == i]['Country/Region'].tolist()
+        cluster_countries = data[data['Cluster'] == i]['Country/Region'].tolist()
+        cluster_members[i] = cluster_countries
         cluster_representatives[i] = cluster_countries[:5]  # Top 5 countries per cluster
     
-    return jsonify({
+    return {
         'cluster_statistics': cluster_stats,
-        'cluster_representatives': cluster_representatives
-    })
+        'cluster_representatives': cluster_representatives,
+        'cluster_members': cluster_members
+    }
+
+@app.route('/api/coalescing', methods=['GET'])
+def coalescing_metrics():
+    """Report how many expensive requests were served by a shared computation"""
+    return jsonify(expensive_flights.metrics())
+
+def parse_region_series(payload, value_column='Confirmed'):
+    """
+    Region x date array of cumulative counts from a request payload, given either
+    as columnar regions/dates/cumulative or as long-format records in `data`
+    Returns (regions, dates, cumulative, records frame or None)
+    """
+    if 'cumulative' in payload:
+        regions = payload.get('regions') or []
+        dates = pd.to_datetime(payload.get('dates') or [])
+        cumulative = np.asarray(payload['cumulative'], dtype='float64')
+        if cumulative.ndim != 2 or cumulative.shape != (len(regions), len(dates)):
+            raise ValueError('cumulative must be a regions x dates matrix')
+        return regions, dates, cumulative, None
+    
+    records = payload.get('data')
+    if not records:
+        raise ValueError('No time series data available')
+    
+    series = pd.DataFrame(records)
+    if 'Date' not in series.columns:
+        raise ValueError('Time series data requires a Date column')
+    if value_column not in series.columns:
+        raise ValueError(f'Time series data has no {value_column} column')
+    
+    regions, dates, cumulative = to_region_date_array(series, value_column=value_column)
+    return regions, dates, cumulative, series
+
+@app.route('/api/metrics', methods=['POST'])
+def epidemiological_metrics():
+    """Compute doubling time, growth, Rt and per-100k rates for all regions at once"""
+    window = int(request.json.get('window', 7))
+    serial_interval = int(request.json.get('serial_interval', 4))
+    include_series = bool(request.json.get('include_series', False))
+    
+    if window < 1:
+        return jsonify({'error': 'window must be at least 1'})
+    if serial_interval < 0:
+        return jsonify({'error': 'serial_interval must not be negative'})
+    
+    try:
+        regions, dates, cumulative, series = parse_region_series(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    
+    if not len(dates):
+        return jsonify({'error': 'At least one date is required'})
+    
+    # Population is a per-region constant, so take one value per region
+    population = request.json.get('population')
+    if series is not None and 'Population' in series.columns:
+        population = (pd.to_numeric(series['Population'], errors='coerce')
+                      .groupby(series['Country/Region']).max()
+                      .reindex(regions).values)
+    elif population is not None and (not isinstance(population, list) or len(population) != len(regions)):
+        return jsonify({'error': 'population must have one value per region'})
+    
+    metrics = compute_epi_metrics(cumulative, population, window, serial_interval)
+    
+    response = {
+        'regions': regions,
+        'as_of': dates[-1].strftime('%Y-%m-%d'),
+        'latest': {name: to_json_values(values[:, -1]) for name, values in metrics.items()}
+    }
+    
+    if include_series:
+        response['dates'] = dates.strftime('%Y-%m-%d').tolist()
+        response['series'] = {name: to_json_values(values) for name, values in metrics.items()}
+    
+    return jsonify(response)
+
+@app.route('/api/anomalies', methods=['POST'])
+def detect_anomalies():
+    """
+    Flag reporting spikes and trend breaks in every region's daily series
+    With `incremental` set, only days after the previous scan are checked
+    """
+    metric = request.json.get('metric', 'Confirmed')
+    incremental = bool(request.json.get('incremental', False))
+    
+    try:
+        params = {
+            'window': int(request.json.get('window', 28)),
+            'threshold': float(request.json.get('threshold', 5.0)),
+            'min_excess': float(request.json.get('min_excess', 5)),
+            'cusum_threshold': float(request.json.get('cusum_threshold', 8.0))
+        }
+        regions, dates, cumulative, _ = parse_region_series(request.json, metric)
+        detector = anomaly_detectors.get(metric)
+        if incremental and detector is not None:
+            # An incremental scan continues the stored detector's state, so
+            # its parameters cannot change without a full scan
+            changed = sorted(name for name in params
+                             if name in request.json and getattr(detector, name) != params[name])
+            if changed:
+                raise ValueError(f'Parameters differ from the stored detector: {changed}; '
+                                 'run a full scan to change them')
+            flags = detector.update(dates, cumulative, regions)
+        else:
+            detector = AnomalyDetector(**params)
+            flags = detector.fit(regions, dates, cumulative)
+            anomaly_detectors[metric] = detector
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)})
+    
+    summary = {
+        'metric': metric,
+        'as_of': detector.last_date.strftime('%Y-%m-%d') if detector.last_date is not None else None,
+        'regions_scanned': len(detector.regions),
+        'flag_count': len(flags)
+    }
+    
+    fmt = stream_format(request)
+    if fmt:
+        return stream_response(iter_anomaly_events(summary, flags), fmt)
+    
+    summary['flags'] = flags
+    return jsonify(summary)
+
+def iter_anomaly_events(summary, flags):
+    """Scan summary first, then the flags in batches"""
+    yield 'meta', summary
+    for batch in iter_batches(flags, STREAM_BATCH_SIZE):
+        yield 'flags', batch
 
 @app.route('/api/trends', methods=['POST'])
 def analyze_trends():
     """Analyze trends and patterns in the data"""
-    if covid_data is None:
+    dataset = covid_dataset
+    if dataset is None:
         return jsonify({'error': 'No data available'})
     
+    key = make_request_key('trends', dataset.version)
+    return jsonify(precompute_pipeline.fetch(dataset.version, key, compute_trends, dataset.data))
+
+def compute_trends(data):
+    """Growth hotspots, recovery/death ratios and regional progression"""
     # Calculate growth rates
-    growth_rates = covid_data.groupby('Country/Region').agg({
+    growth_rates = data.groupby('Country/Region', observed=True).agg({
         'New cases': 'sum',
         'Confirmed': 'last'
     })
@@ -158,46 +632,52 @@ def analyze_trends():
     hotspots = growth_rates.nlargest(10, 'Growth Rate').to_dict('index')
     
     # Calculate recovery vs death ratio
-    recovery_death_ratio = covid_data.groupby('WHO Region').agg({
+    recovery_death_ratio = data.groupby('WHO Region', observed=True).agg({
         'Recovered': 'sum',
         'Deaths': 'sum'
     })
     recovery_death_ratio['Ratio'] = (recovery_death_ratio['Recovered'] / recovery_death_ratio['Deaths']).round(2)
     
     # Regional progression
-    regional_progression = covid_data.groupby('WHO Region').agg({
+    regional_progression = data.groupby('WHO Region', observed=True).agg({
         'New cases': 'sum',
         'New deaths': 'sum',
         'New recovered': 'sum'
     }).to_dict('index')
     
-    return jsonify({
+    return {
         'hotspots': hotspots,
         'recovery_death_ratio': recovery_death_ratio.to_dict('index'),
         'regional_progression': regional_progression
-    })
+    }
 
 @app.route('/api/correlations', methods=['POST'])
 def analyze_correlations():
     """Analyze correlations between different metrics"""
-    if covid_data is None:
+    dataset = covid_dataset
+    if dataset is None:
         return jsonify({'error': 'No data available'})
     
+    key = make_request_key('correlations', dataset.version)
+    return jsonify(precompute_pipeline.fetch(dataset.version, key, compute_correlations, dataset.data))
+
+def compute_correlations(data):
+    """Correlations between the core metrics (and population density if present)"""
     # Calculate correlations between metrics
     correlation_metrics = ['Confirmed', 'Deaths', 'Recovered', 'Active', 'New cases']
-    correlations = covid_data[correlation_metrics].corr().round(3).to_dict()
+    correlations = data[correlation_metrics].corr().round(3).to_dict()
     
     # Analyze relationship between population density and spread
     # (assuming we have population density data)
-    if 'Population Density' in covid_data.columns:
-        density_correlation = covid_data['Confirmed'].corr(covid_data['Population Density']).round(3)
+    if 'Population Density' in data.columns:
+        density_correlation = data['Confirmed'].corr(data['Population Density']).round(3)
     else:
         density_correlation = None
     
-    return jsonify({
+    return {
         'metric_correlations': correlations,
         'density_correlation': density_correlation
-    })
+    }
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000) 
\ No newline at end of file
@@ -0,0 +1,230 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from prophet import Prophet
+
+# z-score for the 80% intervals Prophet reports by default
+INTERVAL_Z = 1.2816
+
+# Upper bound on backtest worker processes, whatever the caller asks for
+MAX_BACKTEST_WORKERS = min(8, os.cpu_count() or 1)
+
+# Fitted forecasts keyed by (engine, country, history fingerprint)
+FIT_CACHE_SIZE = 4096
+_fit_cache = OrderedDict()
+_fit_cache_lock = threading.Lock()
+
+def _residual_interval(yhat, residuals, horizon):
+    """Symmetric interval that widens with the square root of the horizon"""
+    spread = np.nanstd(residuals) if len(residuals) > 1 else 0.0
+    width = INTERVAL_Z * spread * np.sqrt(np.arange(1, horizon + 1))
+    return yhat - width, yhat + width
+
+def forecast_naive(history, horizon):
+    """Random walk with drift"""
+    values = history.values.astype('float64')
+    drift = (values[-1] - values[0]) / (len(values) - 1) if len(values) > 1 else 0.0
+    yhat = values[-1] + drift * np.arange(1, horizon + 1)
+    lower, upper = _residual_interval(yhat, np.diff(values) - drift, horizon)
+    return yhat, lower, upper
+
+def forecast_holt(history, horizon):
+    """Holt's linear trend exponential smoothing"""
+    values = history.values.astype('float64')
+    model = ExponentialSmoothing(values, trend='add').fit()
+    yhat = np.asarray(model.forecast(horizon), dtype='float64')
+    lower, upper = _residual_interval(yhat, model.resid, horizon)
+    return yhat, lower, upper
+
+def forecast_prophet(history, horizon):
+    """Prophet with the same settings as /api/forecast"""
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True)
+    model.fit(pd.DataFrame({'ds': history.index, 'y': history.values.astype('float64')}))
+
+    future = model.make_future_dataframe(periods=horizon)
+    forecast = model.predict(future).tail(horizon)
+    return forecast['yhat'].values, forecast['yhat_lower'].values, forecast['yhat_upper'].values
+
+# Forecast engines, roughly from most to least expensive
+ENGINES = {
+    'prophet': forecast_prophet,
+    'holt': forecast_holt,
+    'naive': forecast_naive
+}
+
+def _history_fingerprint(history):
+    """Stable hash of a history slice so overlapping origins share fits"""
+    digest = hashlib.sha1(history.index.values.astype('datetime64[D]').tobytes())
+    digest.update(history.values.astype('float64').tobytes())
+    return digest.hexdigest()
+
+def _run_fit(task):
+    """
+    Worker entry point: fit one engine on one history and time it
+    A failed fit returns NaN forecasts and its error instead of raising, so
+    one bad series does not abort the whole backtest
+    """
+    engine, dates, values, horizon = task
+    start = time.perf_counter()
+    try:
+        yhat, lower, upper = ENGINES[engine](pd.Series(values, index=pd.DatetimeIndex(dates)), horizon)
+    except Exception as e:
+        missing = np.full(horizon, np.nan)
+        return missing, missing, missing, time.perf_counter() - start, str(e)
+    return np.asarray(yhat), np.asarray(lower), np.asarray(upper), time.perf_counter() - start, None
+
+def rolling_origin_cutoffs(n_points, initial, period, horizon):
+    """History lengths at which to cut the series so `horizon` actuals remain"""
+    return list(range(initial, n_points - horizon + 1, period))
+
+def _cached_fit(key, horizon):
+    with _fit_cache_lock:
+        fit = _fit_cache.get(key)
+        if fit is None or len(fit[0]) < horizon:
+            return None
+        _fit_cache.move_to_end(key)
+        return fit
+
+def _store_fit(key, fit):
+    with _fit_cache_lock:
+        _fit_cache[key] = fit
+        _fit_cache.move_to_end(key)
+        while len(_fit_cache) > FIT_CACHE_SIZE:
+            _fit_cache.popitem(last=False)
+
+def _score(actual, yhat, lower, upper):
+    """MAE, MAPE (non-zero actuals only) and interval coverage in percent"""
+    errors = np.abs(actual - yhat)
+    nonzero = actual != 0
+    return {
+        'mae': float(errors.mean()),
+        'mape': float((errors[nonzero] / np.abs(actual[nonzero])).mean() * 100) if nonzero.any() else np.nan,
+        'coverage': float(((actual >= lower) & (actual <= upper)).mean() * 100)
+    }
+
+def backtest(series_by_country, horizons=(7, 14), engines=('prophet', 'holt', 'naive'),
+             initial=30, period=7, max_workers=None):
+    """
+    Rolling-origin cross-validation of forecast engines
+
+    Each (engine, country, cutoff) is fitted once for the largest horizon and
+    scored for every horizon over the first `h` forecast days. Fits that are
+    not already cached are distributed over a process pool. Failed fits are
+    scored as NaN and reported in an `error` column.
+    """
+    horizons = sorted(int(h) for h in horizons)
+    if not horizons:
+        raise ValueError('At least one forecast horizon is required')
+    if initial < 2:
+        raise ValueError('initial must be at least 2')
+    if period < 1:
+        raise ValueError('period must be at least 1')
+    max_horizon = horizons[-1]
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        raise ValueError(f'Unknown forecast engines: {unknown}')
+
+    jobs = []
+    for country, series in series_by_country.items():
+        series = series.dropna().sort_index()
+        for cutoff in rolling_origin_cutoffs(len(series), initial, period, max_horizon):
+            history = series.iloc[:cutoff]
+            fingerprint = _history_fingerprint(history)
+            for engine in engines:
+                jobs.append({
+                    'engine': engine,
+                    'country': country,
+                    'cutoff': history.index[-1],
+                    'key': (engine, country, fingerprint),
+                    'history': history,
+                    'actual': series.values[cutoff:cutoff + max_horizon].astype('float64')
+                })
+
+    # Reuse fits from overlapping origins and earlier runs
+    fits = {}
+    pending = []
+    for job in jobs:
+        fit = _cached_fit(job['key'], max_horizon)
+        if fit is not None:
+            fits[job['key']] = fit
+        elif job['key'] not in fits:
+            fits[job['key']] = None
+            pending.append(job)
+
+    tasks = [(job['engine'], job['history'].index.values, job['history'].values, max_horizon)
+             for job in pending]
+    max_workers = max(1, min(int(max_workers or MAX_BACKTEST_WORKERS), MAX_BACKTEST_WORKERS))
+    if max_workers == 1 or len(tasks) <= 1:
+        results = [_run_fit(task) for task in tasks]
+    else:
+        # Spawn rather than fork: the server process already runs request and
+        # precompute threads, and a forked child can inherit their held locks
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            results = list(pool.map(_run_fit, tasks, chunksize=max(1, len(tasks) // 32)))
+
+    failed = 0
+    for job, fit in zip(pending, results):
+        fits[job['key']] = fit
+        if fit[4] is None:
+            _store_fit(job['key'], fit)
+        else:
+            failed += 1
+
+    rows = []
+    for job in jobs:
+        yhat, lower, upper, seconds, error = fits[job['key']]
+        for horizon in horizons:
+            row = {
+                'engine': job['engine'],
+                'country': job['country'],
+                'cutoff': job['cutoff'].strftime('%Y-%m-%d'),
+                'horizon': horizon,
+                'fit_seconds': seconds,
+                'error': error
+            }
+            if error is None:
+                row.update(_score(job['actual'][:horizon], yhat[:horizon], lower[:horizon], upper[:horizon]))
+            else:
+                row.update({'mae': np.nan, 'mape': np.nan, 'coverage': np.nan})
+            rows.append(row)
+
+    return {
+        'results': pd.DataFrame(rows),
+        'fits': len(pending),
+        'failed_fits': failed,
+        'cache_hits': len(jobs) - len(pending)
+    }
+
+def summarize_backtest(results):
+    """Average accuracy and fit cost per engine and horizon, with failed fits counted apart"""
+    if results.empty:
+        return results
+    grouped = results.groupby(['engine', 'horizon'])
+    summary = grouped.agg({
+        'mae': 'mean',
+        'mape': 'mean',
+        'coverage': 'mean',
+        'fit_seconds': 'mean'
+    }).round(4)
+    summary['evaluations'] = grouped['mae'].count()
+    summary['failures'] = grouped['error'].count()
+    return summary
+
+def choose_engine(summary, horizon, max_mape):
+    """Pick the cheapest engine whose MAPE at `horizon` meets the accuracy bar without failed fits"""
+    if summary.empty:
+        return None
+    at_horizon = summary.xs(horizon, level='horizon')
+    eligible = at_horizon[(at_horizon['mape'] <= max_mape) & (at_horizon['failures'] == 0)]
+    if eligible.empty:
+        return None
+    return eligible['fit_seconds'].idxmin()
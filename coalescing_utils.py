@@ -0,0 +1,71 @@
+import json
+import threading
+
+class _InFlightCall:
+    """A computation that is currently running for a given key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical computations into a single execution
+    Callers that arrive while a computation for the same key is running
+    wait for it and share its result (or its exception)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._metrics = {
+            'requests': 0,
+            'executions': 0,
+            'coalesced_hits': 0,
+            'errors': 0
+        }
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn once per key among concurrent callers and return its result"""
+        with self._lock:
+            self._metrics['requests'] += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+            else:
+                self._metrics['coalesced_hits'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                self._metrics['executions'] += 1
+                if call.error is not None:
+                    self._metrics['errors'] += 1
+            call.done.set()
+
+        return call.result
+
+    def metrics(self):
+        """Return a snapshot of the coalescing counters"""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot['in_flight'] = len(self._in_flight)
+        return snapshot
+
+def make_request_key(endpoint, dataset_version, params=None):
+    """Build a hashable key from the endpoint, dataset version and parameters"""
+    return (endpoint, dataset_version, json.dumps(params or {}, sort_keys=True, default=str))
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from schema_utils import COUNT_COLUMNS
+
+# Region levels from coarsest to finest; feeds use whichever prefix they carry
+HIERARCHY_LEVELS = ['WHO Region', 'Country/Region', 'Province/State', 'Admin2']
+
+# Name given to rows that stop above a level (e.g. countries without provinces)
+UNASSIGNED = '(unassigned)'
+
+def _fill_unassigned(series):
+    """Replace missing level values so those rows still roll up"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.isna().any():
+            if UNASSIGNED not in series.cat.categories:
+                series = series.cat.add_categories([UNASSIGNED])
+            series = series.fillna(UNASSIGNED)
+        return series
+    return series.fillna(UNASSIGNED).astype(str)
+
+def _as_path(key):
+    return key if isinstance(key, tuple) else (key,)
+
+class RegionHierarchy:
+    """
+    Region hierarchy over a leaf table with a pre-aggregated rollup per level
+    and parent -> children indexes, so drill-down and roll-up queries read
+    precomputed nodes instead of regrouping the leaf rows
+    """
+
+    def __init__(self, df, levels=None, metrics=None):
+        self.levels = [level for level in (levels or HIERARCHY_LEVELS) if level in df.columns]
+        self.metrics = [metric for metric in (metrics or COUNT_COLUMNS) if metric in df.columns]
+        if not self.levels:
+            raise ValueError('Data has no region hierarchy columns')
+
+        leaf = df[self.levels + self.metrics].copy()
+        for level in self.levels:
+            leaf[level] = _fill_unassigned(leaf[level])
+
+        # Aggregate the leaf table once, then build each coarser level from
+        # the level below it
+        self.rollups = {}
+        current = leaf.groupby(self.levels, observed=True)[self.metrics].sum()
+        self.rollups[self.levels[-1]] = current
+        for depth in range(len(self.levels) - 1, 0, -1):
+            current = current.groupby(level=list(range(depth)), observed=True).sum()
+            self.rollups[self.levels[depth - 1]] = current
+        self.total = current.sum()
+
+        # Parent path -> row positions of its children in the next level's rollup
+        self.children_index = {(): np.arange(len(self.rollups[self.levels[0]]))}
+        for depth in range(1, len(self.levels)):
+            rollup = self.rollups[self.levels[depth]]
+            grouped = rollup.groupby(level=list(range(depth)), observed=True).indices
+            for key, positions in grouped.items():
+                self.children_index[_as_path(key)] = positions
+
+    def depth_of(self, path):
+        if len(path) > len(self.levels):
+            raise ValueError(f'Path is deeper than the hierarchy: {list(path)}')
+        return len(path)
+
+    def rollup(self, level):
+        """Precomputed aggregates for every node at a level"""
+        if level not in self.rollups:
+            raise ValueError(f'Unknown hierarchy level: {level}')
+        return self.rollups[level]
+
+    def node(self, path=()):
+        """Aggregates for a single node; the empty path is the global total"""
+        path = tuple(path)
+        if not self.depth_of(path):
+            return self.total
+        rollup = self.rollups[self.levels[len(path) - 1]]
+        try:
+            return rollup.loc[path if len(path) > 1 else path[0]]
+        except KeyError:
+            raise ValueError(f'Unknown hierarchy node: {list(path)}')
+
+    def children(self, path=()):
+        """Drill down: aggregates for the direct children of a node"""
+        path = tuple(path)
+        if self.depth_of(path) == len(self.levels):
+            # Leaves have no children, but the leaf itself must exist
+            self.node(path)
+            return self.rollups[self.levels[-1]].iloc[0:0]
+        if path not in self.children_index:
+            raise ValueError(f'Unknown hierarchy node: {list(path)}')
+        return self.rollups[self.levels[len(path)]].iloc[self.children_index[path]]
+
+    def parent(self, path):
+        """Roll up: the path of a node's parent"""
+        return tuple(path)[:-1]
+
+    def label(self, key):
+        """
+        Readable label for a rollup row; country names are unique, so the WHO
+        Region prefix is dropped below the top level
+        """
+        path = _as_path(key)
+        if len(path) > 1 and self.levels[0] == 'WHO Region':
+            path = path[1:]
+        return ' / '.join(str(part) for part in path)
+
+    def node_dict(self, path=()):
+        """Aggregates for a single node as plain Python values"""
+        return {
+            metric: None if pd.isna(value) else (value.item() if hasattr(value, 'item') else value)
+            for metric, value in self.node(path).items()
+        }
+
+    def to_dict(self, rollup, metrics=None):
+        """Convert rollup rows to {label: {metric: value}} like DataFrame.to_dict('index')"""
+        rollup = rollup[metrics] if metrics else rollup
+        return {self.label(key): values for key, values in rollup.to_dict('index').items()}
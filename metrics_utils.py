@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+def to_region_date_array(data, value_column='Confirmed', region_column='Country/Region',
+                         date_column='Date'):
+    """
+    Pivot long-format records into a region x date array
+    Returns (regions, dates, values) with NaN for missing observations
+    """
+    frame = data[[region_column, date_column, value_column]].copy()
+    frame[date_column] = pd.to_datetime(frame[date_column])
+    frame[value_column] = pd.to_numeric(frame[value_column], errors='coerce').astype('float64')
+
+    # min_count keeps null observations as NaN rather than summing them to 0
+    wide = (frame.groupby([region_column, date_column], observed=True)[value_column]
+            .sum(min_count=1).unstack(date_column).sort_index(axis=1))
+
+    return wide.index.tolist(), wide.columns, wide.to_numpy(dtype='float64')
+
+def _lag(values, periods):
+    """Shift a region x date array right along the date axis, padding with NaN"""
+    lagged = np.full_like(values, np.nan)
+    if periods < values.shape[1]:
+        lagged[:, periods:] = values[:, :values.shape[1] - periods]
+    return lagged
+
+def _rolling_sum(values, window):
+    """Trailing rolling sum along the date axis; NaN unless the window is complete"""
+    valid = np.isfinite(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    rolled = csum - np.nan_to_num(_lag(csum, window), nan=0.0)
+    complete = (counts - np.nan_to_num(_lag(counts.astype('float64'), window), nan=0.0)) == window
+    return np.where(complete, rolled, np.nan)
+
+def daily_new_cases(cumulative):
+    """Derive daily new cases from cumulative counts, dropping negative corrections"""
+    new_cases = np.diff(cumulative, axis=1, prepend=np.nan)
+    return np.where(new_cases < 0, 0.0, new_cases)
+
+def log_growth_rate(cumulative, window=7):
+    """Log-linear daily growth rate over a trailing window of cumulative counts"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logged = np.log(np.where(cumulative > 0, cumulative, np.nan))
+        return (logged - _lag(logged, window)) / window
+
+def doubling_time(cumulative, window=7):
+    """Doubling time in days; NaN where cases are flat, shrinking or non-positive"""
+    growth = log_growth_rate(cumulative, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(growth > 0, np.log(2) / growth, np.nan)
+
+def per_100k(values, population):
+    """Scale a region x date array by each region's population"""
+    population = np.asarray(population, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(population > 0, 100000 / population, np.nan)
+    return values * scale[:, None]
+
+def estimate_rt(new_cases, window=7, serial_interval=4):
+    """
+    Simple reproduction number estimate: cases in the trailing window divided
+    by cases in the same-length window one serial interval earlier
+    """
+    current = _rolling_sum(new_cases, window)
+    previous = _lag(current, serial_interval)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(previous > 0, current / previous, np.nan)
+
+def compute_epi_metrics(cumulative, population=None, window=7, serial_interval=4):
+    """
+    Compute doubling time, growth rate, Rt and per-100k rates for every
+    region x date cell of a cumulative case array in one pass
+    """
+    cumulative = np.asarray(cumulative, dtype='float64')
+    new_cases = daily_new_cases(cumulative)
+
+    metrics = {
+        'growth_rate': log_growth_rate(cumulative, window),
+        'doubling_time': doubling_time(cumulative, window),
+        'rt': estimate_rt(new_cases, window, serial_interval)
+    }
+
+    if population is not None:
+        metrics['cases_per_100k'] = per_100k(cumulative, population)
+        metrics['incidence_per_100k'] = per_100k(_rolling_sum(new_cases, window), population)
+
+    return metrics
+
+def to_json_values(values, decimals=4):
+    """Round an array and replace NaN/inf with None so it serialises to JSON"""
+    values = np.round(np.asarray(values, dtype='float64'), decimals)
+    return np.where(np.isfinite(values), values, None).tolist()
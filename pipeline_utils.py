@@ -0,0 +1,146 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+class PipelineTask:
+    """One derived artifact: how to compute it, what it waits for and how urgent it is"""
+
+    def __init__(self, name, key, fn, args=(), deps=(), priority=0):
+        self.name = name
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.deps = list(deps)
+        self.priority = priority
+
+def order_tasks(tasks):
+    """Topological order of tasks, breaking ties by priority (lower runs first)"""
+    by_name = {task.name: task for task in tasks}
+    missing = {dep for task in tasks for dep in task.deps} - set(by_name)
+    if missing:
+        raise ValueError(f'Unknown pipeline dependencies: {sorted(missing)}')
+
+    waiting = {task.name: set(task.deps) for task in tasks}
+    dependents = {task.name: [] for task in tasks}
+    for task in tasks:
+        for dep in task.deps:
+            dependents[dep].append(task.name)
+
+    ready = [(task.priority, i, task.name) for i, task in enumerate(tasks) if not task.deps]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        _, _, name = heapq.heappop(ready)
+        ordered.append(by_name[name])
+        for dependent in dependents[name]:
+            waiting[dependent].discard(name)
+            if not waiting[dependent]:
+                task = by_name[dependent]
+                heapq.heappush(ready, (task.priority, tasks.index(task), dependent))
+
+    if len(ordered) != len(tasks):
+        raise ValueError('Pipeline dependencies contain a cycle')
+    return ordered
+
+class PrecomputePipeline:
+    """
+    Background precompute of derived artifacts for the current dataset version
+    Artifacts are published as soon as they finish; requests for an artifact
+    that is not ready yet compute it through the shared single-flight layer,
+    so they join a pipeline run already in progress instead of duplicating it.
+    Scheduled artifacts are kept for the whole version; results for other keys
+    (e.g. ad hoc forecast parameters) are kept in a bounded LRU.
+    """
+
+    def __init__(self, flights, max_workers=4, max_extra_results=128):
+        self._flights = flights
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._version = None
+        self._status = {}
+        self._scheduled = set()
+        self._results = {}
+        self._extra_results = OrderedDict()
+        self._max_extra_results = max_extra_results
+        self._futures = []
+
+    def start(self, version, tasks):
+        """Schedule all tasks for a new dataset version, dropping the previous run"""
+        ordered = order_tasks(tasks)
+
+        with self._lock:
+            for future in self._futures:
+                future.cancel()
+            self._version = version
+            self._scheduled = {task.key for task in ordered}
+            self._results = {}
+            self._extra_results = OrderedDict()
+            self._status = {
+                task.name: {'status': 'pending', 'priority': task.priority, 'deps': task.deps}
+                for task in ordered
+            }
+
+            futures = {}
+            for task in ordered:
+                dep_futures = [futures[dep] for dep in task.deps]
+                futures[task.name] = self._executor.submit(self._run, version, task, dep_futures)
+            self._futures = list(futures.values())
+
+    def _run(self, version, task, dep_futures):
+        wait(dep_futures)
+        if not self._update(version, task.name, status='running'):
+            return
+
+        start = time.perf_counter()
+        try:
+            self.fetch(version, task.key, task.fn, *task.args)
+        except Exception as e:
+            self._update(version, task.name, status='failed', error=str(e),
+                         seconds=round(time.perf_counter() - start, 3))
+            return
+        self._update(version, task.name, status='ready', seconds=round(time.perf_counter() - start, 3))
+
+    def _update(self, version, name, **fields):
+        """Record task progress unless a newer dataset version has replaced this run"""
+        with self._lock:
+            if version != self._version or name not in self._status:
+                return False
+            self._status[name].update(fields)
+            return True
+
+    def fetch(self, version, key, fn, *args):
+        """Return a published artifact, or compute and publish it"""
+        with self._lock:
+            if version == self._version:
+                if key in self._results:
+                    return self._results[key]
+                if key in self._extra_results:
+                    self._extra_results.move_to_end(key)
+                    return self._extra_results[key]
+
+        result = self._flights.do(key, fn, *args)
+
+        with self._lock:
+            if version == self._version:
+                if key in self._scheduled:
+                    self._results[key] = result
+                else:
+                    self._extra_results[key] = result
+                    self._extra_results.move_to_end(key)
+                    while len(self._extra_results) > self._max_extra_results:
+                        self._extra_results.popitem(last=False)
+        return result
+
+    def status(self):
+        """Snapshot of every artifact's progress for the current version"""
+        with self._lock:
+            artifacts = {name: dict(fields) for name, fields in self._status.items()}
+            version = self._version
+
+        counts = {}
+        for fields in artifacts.values():
+            counts[fields['status']] = counts.get(fields['status'], 0) + 1
+
+        return {'version': version, 'summary': counts, 'artifacts': artifacts}
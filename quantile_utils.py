@@ -0,0 +1,241 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Labels used by the vaccination analysis when four bins are requested
+QUARTILE_LABELS = ['Low', 'Medium-Low', 'Medium-High', 'High']
+
+class QuantileSketch:
+    """
+    Mergeable t-digest style quantile sketch
+    Each centroid also carries per-column sums and counts of payload metrics,
+    so bin statistics can be read off the sketch without a second pass
+    """
+
+    def __init__(self, compression=200, n_payload=0):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.sums = np.empty((0, n_payload))
+        self.counts = np.empty((0, n_payload))
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def update(self, values, payload=None):
+        """Add a batch of values (and aligned payload rows) to the sketch"""
+        values = np.asarray(values, dtype='float64')
+        if payload is None:
+            payload = np.empty((len(values), self.sums.shape[1]))
+        payload = np.asarray(payload, dtype='float64').reshape(len(values), -1)
+
+        valid = np.isfinite(values)
+        values, payload = values[valid], payload[valid]
+        if not len(values):
+            return self
+
+        payload_valid = np.isfinite(payload)
+        self._absorb(values, np.ones(len(values)),
+                     np.where(payload_valid, payload, 0.0), payload_valid.astype('float64'))
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        if len(other.means):
+            self._absorb(other.means, other.weights, other.sums, other.counts)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    def _absorb(self, means, weights, sums, counts):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        sums = np.concatenate([self.sums, sums])
+        counts = np.concatenate([self.counts, counts])
+
+        order = np.argsort(means, kind='mergesort')
+        means, weights, sums, counts = means[order], weights[order], sums[order], counts[order]
+
+        # Centroids sharing a unit of the k1 scale function are merged, which
+        # keeps the tails at full resolution and the middle coarse
+        cumulative = np.cumsum(weights)
+        q_mid = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        _, starts = np.unique(np.floor(k), return_index=True)
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        self.sums = np.add.reduceat(sums, starts, axis=0) if sums.shape[1] else sums[starts]
+        self.counts = np.add.reduceat(counts, starts, axis=0) if counts.shape[1] else counts[starts]
+
+    def quantile(self, q):
+        """Estimate one or more quantiles by interpolating between centroids"""
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan)
+        positions = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(np.asarray(q, dtype='float64') * self.total,
+                         np.concatenate([[0.0], positions, [self.total]]),
+                         np.concatenate([[self.min], self.means, [self.max]]))
+
+class CorrelationAccumulator:
+    """Mergeable Pearson correlation using chunk-wise centred moments"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0
+        self.syy = 0.0
+        self.sxy = 0.0
+
+    def update(self, x, y):
+        """Add the pairwise-complete observations of a chunk"""
+        x = np.asarray(x, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+        mask = np.isfinite(x) & np.isfinite(y)
+        x, y = x[mask], y[mask]
+        if not len(x):
+            return self
+
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
+        self._combine(len(x), mean_x, mean_y, (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum())
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator into this one"""
+        if other.n:
+            self._combine(other.n, other.mean_x, other.mean_y, other.sxx, other.syy, other.sxy)
+        return self
+
+    def _combine(self, n, mean_x, mean_y, sxx, syy, sxy):
+        total = self.n + n
+        delta_x = mean_x - self.mean_x
+        delta_y = mean_y - self.mean_y
+        scale = self.n * n / total
+
+        self.sxx += sxx + delta_x * delta_x * scale
+        self.syy += syy + delta_y * delta_y * scale
+        self.sxy += sxy + delta_x * delta_y * scale
+        self.mean_x += delta_x * n / total
+        self.mean_y += delta_y * n / total
+        self.n = total
+
+    def value(self):
+        if self.n < 2 or self.sxx <= 0 or self.syy <= 0:
+            return np.nan
+        return float(self.sxy / np.sqrt(self.sxx * self.syy))
+
+def bin_labels(bins):
+    """Default labels for a quantile binning"""
+    return QUARTILE_LABELS if bins == 4 else [f'Q{i + 1}' for i in range(bins)]
+
+def _exact_bin_stats(data, column, metrics, bins, labels, correlate):
+    """Exact quantile binning for frames that comfortably fit in memory"""
+    # Bin by rank so tied values are split across neighbouring bins, as the
+    # sketch does, instead of producing duplicate edges
+    key = pd.to_numeric(data[column], errors='coerce')
+    binned = pd.qcut(key.rank(method='first'), q=bins, labels=labels)
+    edges = key.quantile(np.linspace(0, 1, bins + 1)).values
+
+    values = data[metrics].apply(pd.to_numeric, errors='coerce')
+    grouped = values.groupby(binned, observed=False)
+
+    return {
+        'method': 'exact',
+        'edges': [float(edge) for edge in edges],
+        'counts': {label: int(n) for label, n in binned.value_counts().reindex(labels).items()},
+        'statistics': grouped.mean().round(2).to_dict(),
+        'correlations': {
+            metric: key.corr(pd.to_numeric(data[metric], errors='coerce'))
+            for metric in correlate
+        }
+    }
+
+def _sketch_bin_stats(chunks, column, metrics, bins, labels, correlate, compression):
+    """Single pass quantile binning over chunks using a mergeable sketch"""
+    sketch = QuantileSketch(compression=compression, n_payload=len(metrics))
+    correlations = {metric: CorrelationAccumulator() for metric in correlate}
+
+    for chunk in chunks:
+        values = pd.to_numeric(chunk[column], errors='coerce').astype('float64').values
+        payload = chunk[metrics].apply(pd.to_numeric, errors='coerce').astype('float64').values
+        sketch.update(values, payload)
+        for metric, accumulator in correlations.items():
+            accumulator.update(values, pd.to_numeric(chunk[metric], errors='coerce').astype('float64').values)
+
+    edges = sketch.quantile(np.linspace(0, 1, bins + 1))
+
+    # Spread each centroid uniformly over its rank interval and split it
+    # between the bins whose rank ranges it overlaps
+    upper = np.cumsum(sketch.weights)
+    lower = upper - sketch.weights
+    bounds = np.linspace(0, 1, bins + 1) * sketch.total
+    overlap = np.clip(np.minimum(upper[:, None], bounds[None, 1:]) -
+                      np.maximum(lower[:, None], bounds[None, :-1]), 0, None)
+    share = overlap / sketch.weights[:, None]
+
+    counts = overlap.sum(axis=0)
+    metric_sums = share.T @ sketch.sums
+    metric_counts = share.T @ sketch.counts
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.round(metric_sums / metric_counts, 2)
+
+    return {
+        'method': 'sketch',
+        'edges': edges.tolist(),
+        'counts': {label: int(round(n)) for label, n in zip(labels, counts)},
+        'statistics': {
+            metric: {label: float(means[i, j]) for i, label in enumerate(labels)}
+            for j, metric in enumerate(metrics)
+        },
+        'correlations': {metric: accumulator.value() for metric, accumulator in correlations.items()}
+    }
+
+def quantile_bin_stats(data, column, metrics, bins=4, labels=None, correlate=None,
+                       exact_threshold=100000, compression=200):
+    """
+    Bin rows by quantiles of `column` and report the mean of each metric per
+    bin plus correlations between `column` and the `correlate` metrics
+
+    `data` is a DataFrame or an iterable of DataFrame chunks. Small frames are
+    binned exactly; large frames and chunked input go through a mergeable
+    quantile sketch in a single pass. Both paths split tied values across
+    neighbouring bins so each bin holds an equal share of rows. Metrics that
+    are missing from the frame are skipped; for chunked input the columns of
+    the first chunk decide, and every later chunk must carry the same columns.
+    The input is never modified.
+    """
+    labels = list(labels) if labels is not None else bin_labels(bins)
+    if len(labels) != bins:
+        raise ValueError('Number of labels must match the number of bins')
+
+    if isinstance(data, pd.DataFrame):
+        columns = data.columns
+    else:
+        chunks = iter(data)
+        first = next(chunks, None)
+        if first is None:
+            raise ValueError('No data to bin')
+        columns = first.columns
+        chunks = itertools.chain([first], chunks)
+
+    if column not in columns:
+        raise ValueError(f'Data has no {column} column')
+    metrics = [metric for metric in metrics if metric in columns]
+    correlate = [metric for metric in (correlate or []) if metric in columns]
+
+    if isinstance(data, pd.DataFrame):
+        if len(data) <= exact_threshold:
+            return _exact_bin_stats(data, column, metrics, bins, labels, correlate)
+        chunks = (data.iloc[start:start + exact_threshold]
+                  for start in range(0, len(data), exact_threshold))
+
+    return _sketch_bin_stats(chunks, column, metrics, bins, labels, correlate, compression)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from schema_utils import DIMENSION_COLUMNS
+
+# Range operators accepted on metric columns
+RANGE_OPERATORS = {
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'lt': np.less,
+    'lte': np.less_equal
+}
+
+def build_dimension_indexes(df, dimensions=DIMENSION_COLUMNS):
+    """
+    Prebuild value -> row positions indexes for categorical dimension columns
+    so equality/IN predicates avoid scanning the column
+    """
+    indexes = {}
+    for col in dimensions:
+        if col not in df.columns or not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        codes = df[col].cat.codes.values
+        order = np.argsort(codes, kind='mergesort')
+        boundaries = np.searchsorted(codes[order], np.arange(len(df[col].cat.categories) + 1))
+        indexes[col] = {
+            category: order[boundaries[i]:boundaries[i + 1]]
+            for i, category in enumerate(df[col].cat.categories)
+        }
+    return indexes
+
+def _dimension_mask(df, column, values, indexes):
+    """Boolean mask for an equality/IN predicate on a dimension"""
+    values = values if isinstance(values, list) else [values]
+    if column in indexes:
+        mask = np.zeros(len(df), dtype=bool)
+        for value in values:
+            positions = indexes[column].get(value)
+            if positions is not None:
+                mask[positions] = True
+        return mask
+    return df[column].isin(values).values
+
+def _range_mask(df, column, bounds):
+    """Boolean mask for range predicates on a metric; missing values never match"""
+    values = pd.to_numeric(df[column], errors='coerce').astype('float64').values
+    mask = np.isfinite(values)
+    for op, bound in bounds.items():
+        if op not in RANGE_OPERATORS:
+            raise ValueError(f'Unknown range operator: {op}')
+        with np.errstate(invalid='ignore'):
+            mask &= RANGE_OPERATORS[op](values, float(bound))
+    return mask
+
+def _to_columnar(frame):
+    """Encode a frame as {column: [values]} with None for missing values"""
+    data = {}
+    for col in frame.columns:
+        series = frame[col]
+        if pd.api.types.is_float_dtype(series.dtype):
+            series = series.astype('float64').round(4)
+        data[col] = [None if pd.isna(value) else value for value in series.tolist()]
+    return data
+
+def _select(df, query, indexes):
+    """Apply predicates, sort and limit; returns (result frame, columns, matched rows)"""
+    indexes = indexes or {}
+    columns = query.get('columns') or list(df.columns)
+    filters = query.get('filters') or {}
+    sort = query.get('sort') or []
+    limit = query.get('limit')
+
+    if not isinstance(columns, list) or not all(isinstance(col, str) for col in columns):
+        raise ValueError('columns must be a list of column names')
+    if not isinstance(filters, dict):
+        raise ValueError('filters must map column names to values or ranges')
+
+    if isinstance(sort, (str, dict)):
+        sort = [sort]
+    if isinstance(sort, list):
+        sort = [{'column': key, 'ascending': True} if isinstance(key, str) else key for key in sort]
+    if not isinstance(sort, list) or not all(isinstance(key, dict) and isinstance(key.get('column'), str)
+                                             for key in sort):
+        raise ValueError('sort entries must be column names or {"column": ..., "ascending": ...}')
+    if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 0):
+        raise ValueError('limit must be a non-negative integer')
+
+    referenced = set(columns) | set(filters) | {key['column'] for key in sort}
+    missing = sorted(referenced - set(df.columns))
+    if missing:
+        raise ValueError(f'Unknown columns: {missing}')
+
+    mask = np.ones(len(df), dtype=bool)
+    for column, predicate in filters.items():
+        if isinstance(predicate, dict):
+            mask &= _range_mask(df, column, predicate)
+        else:
+            mask &= _dimension_mask(df, column, predicate, indexes)
+
+    rows = np.flatnonzero(mask)
+    sort_columns = [key['column'] for key in sort]
+    result = df.iloc[rows][list(dict.fromkeys(columns + sort_columns))]
+
+    if sort:
+        result = result.sort_values(sort_columns, ascending=[bool(key.get('ascending', True)) for key in sort],
+                                    kind='mergesort')
+    if limit is not None:
+        result = result.head(limit)
+
+    return result[columns], columns, len(rows)
+
+def run_query(df, query, indexes=None):
+    """
+    Evaluate a query against a frame and return the matching rows in columnar form
+
+    query = {
+        'columns': ['Country/Region', 'Confirmed'],      # projection (default: all)
+        'filters': {
+            'WHO Region': ['Europe', 'Africa'],           # equality / IN on dimensions
+            'Confirmed': {'gte': 1000, 'lt': 50000}       # ranges on metrics
+        },
+        'sort': [{'column': 'Confirmed', 'ascending': False}],
+        'limit': 10
+    }
+    """
+    result, columns, matched = _select(df, query, indexes)
+    return {
+        'columns': columns,
+        'data': _to_columnar(result),
+        'row_count': int(len(result)),
+        'matched_rows': int(matched)
+    }
+
+def iter_query(df, query, indexes=None, batch_size=1000):
+    """
+    Evaluate a query like run_query but yield (event, payload) pairs: a header
+    with the row counts followed by columnar batches of at most batch_size rows
+    """
+    result, columns, matched = _select(df, query, indexes)
+    yield 'meta', {'columns': columns, 'row_count': int(len(result)), 'matched_rows': int(matched)}
+    for start in range(0, len(result), batch_size):
+        yield 'rows', _to_columnar(result.iloc[start:start + batch_size])
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Dimension columns stored as categoricals
+DIMENSION_COLUMNS = ['Country/Region', 'WHO Region', 'Province/State', 'Admin2']
+
+# Count columns downcast to the smallest nullable integer that fits
+COUNT_COLUMNS = ['Confirmed', 'Deaths', 'Recovered', 'Active',
+                 'New cases', 'New deaths', 'New recovered',
+                 'Confirmed last week', '1 week change']
+
+# Precomputed ratio columns that survive float32 precision
+RATIO_COLUMNS = ['Deaths / 100 Cases', 'Recovered / 100 Cases',
+                 'Deaths / 100 Recovered', '1 week % increase']
+
+# Nullable integer dtypes tried in order; narrower types overflow on sums
+INTEGER_DTYPES = ['Int32', 'Int64']
+
+def downcast_counts(series):
+    """Downcast a count column to the smallest nullable integer dtype"""
+    values = pd.to_numeric(series, errors='coerce')
+    non_null = values.dropna()
+
+    # Keep fractional values as floats rather than truncating them
+    if not np.array_equal(non_null.values, np.floor(non_null.values)):
+        return values.astype('float64')
+
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype.lower())
+        if non_null.empty or (non_null.min() >= info.min and non_null.max() <= info.max):
+            return values.astype(dtype)
+
+    return values.astype('float64')
+
+def optimize_schema(df):
+    """
+    Convert a raw COVID-19 frame to the compact in-memory schema:
+    categorical dimensions, nullable integer counts and float32 ratios
+    """
+    optimized = df.copy()
+
+    for col in DIMENSION_COLUMNS:
+        if col in optimized.columns:
+            optimized[col] = optimized[col].astype('category')
+
+    for col in COUNT_COLUMNS:
+        if col in optimized.columns:
+            optimized[col] = downcast_counts(optimized[col])
+
+    for col in RATIO_COLUMNS:
+        if col in optimized.columns:
+            optimized[col] = pd.to_numeric(optimized[col], errors='coerce').astype('float32')
+
+    return optimized
+
+def memory_report(df, baseline=None):
+    """
+    Report the in-memory footprint of a dataset per column
+    Optionally compares against a baseline frame (e.g. the raw upload)
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = {
+        'rows': int(len(df)),
+        'total_bytes': int(usage.sum()),
+        'columns': {
+            col: {'dtype': str(df[col].dtype), 'bytes': int(usage[col])}
+            for col in df.columns
+        }
+    }
+
+    if baseline is not None:
+        baseline_bytes = int(baseline.memory_usage(deep=True, index=False).sum())
+        report['baseline_bytes'] = baseline_bytes
+        report['savings_pct'] = (
+            round((1 - report['total_bytes'] / baseline_bytes) * 100, 2)
+            if baseline_bytes > 0 else 0.0
+        )
+
+    return report
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+from flask import Response, stream_with_context
+
+# Streaming formats and their content types
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+def stream_format(request):
+    """
+    Streaming format requested by the client, or None for a regular response
+    Selected with ?stream=ndjson|sse or an Accept header for either content type
+    """
+    requested = request.args.get('stream')
+    if requested in STREAM_FORMATS:
+        return requested
+    accept = request.headers.get('Accept', '')
+    for fmt, mimetype in STREAM_FORMATS.items():
+        if mimetype in accept:
+            return fmt
+    return None
+
+def _json_default(value):
+    """Serialise numpy scalars and arrays that slip into payloads"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def encode_event(event, payload, fmt):
+    """Encode one (event, payload) pair as an NDJSON line or an SSE message"""
+    if fmt == 'sse':
+        return f'event: {event}\ndata: {json.dumps(payload, default=_json_default)}\n\n'
+    return json.dumps({'event': event, 'data': payload}, default=_json_default) + '\n'
+
+def stream_response(events, fmt):
+    """
+    Flask response that encodes a generator of (event, payload) pairs as they
+    are produced, so nothing but the current event is held in memory
+    """
+    def generate():
+        try:
+            for event, payload in events:
+                yield encode_event(event, payload, fmt)
+        except Exception as e:
+            yield encode_event('error', {'error': str(e)}, fmt)
+        yield encode_event('end', {}, fmt)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt], headers=headers)
+
+def iter_batches(items, batch_size):
+    """Split a sequence into lists of at most batch_size items"""
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
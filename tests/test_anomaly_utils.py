@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from anomaly_utils import AnomalyDetector
+
+def _series(n_regions=40, n_days=90):
+    """Cumulative Poisson counts with one spike, one level shift and one missing day"""
+    rng = np.random.default_rng(0)
+    daily = rng.poisson(100, (n_regions, n_days)).astype('float64')
+    daily[5, 70] += 900
+    daily[9, 75:] += 300
+    cumulative = np.cumsum(daily, axis=1)
+    cumulative[3, 50] = np.nan
+    regions = [f'R{i}' for i in range(n_regions)]
+    return regions, pd.date_range('2020-03-01', periods=n_days), cumulative
+
+def test_incremental_updates_match_full_scan():
+    regions, dates, cumulative = _series()
+    full = AnomalyDetector().fit(regions, dates, cumulative)
+
+    detector = AnomalyDetector()
+    flags = detector.fit(regions, dates[:60], cumulative[:, :60])
+    for start in range(60, len(dates), 7):
+        flags += detector.update(dates[start:start + 7], cumulative[:, start:start + 7], regions)
+
+    assert {'spike', 'shift_up'} <= {flag['type'] for flag in full}
+    assert flags == full
+
+def test_region_subset_updates_keep_their_own_position():
+    regions, dates, cumulative = _series()
+    full = AnomalyDetector().fit(regions, dates, cumulative)
+
+    detector = AnomalyDetector()
+    flags = detector.fit(regions, dates[:60], cumulative[:, :60])
+    half = len(regions) // 2
+    for start in range(60, len(dates), 5):
+        days = slice(start, start + 5)
+        flags += detector.update(dates[days], cumulative[:half, days], regions[:half])
+        flags += detector.update(dates[days], cumulative[half:, days], regions[half:])
+
+    position = {region: i for i, region in enumerate(regions)}
+    assert sorted(flags, key=lambda flag: (flag['date'], position[flag['region']])) == full
+    assert detector.last_date == dates[-1]
@@ -0,0 +1,71 @@
+import threading
+
+from coalescing_utils import SingleFlight, make_request_key
+
+def _run_concurrently(flight, fn, started, release, callers=8):
+    """Call flight.do from `callers` threads while the leader is held inside fn"""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do('key', fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Release the leader only once every follower has joined the call
+    while flight.metrics()['requests'] < callers:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    results, errors = _run_concurrently(flight, compute, started, release)
+
+    assert results == [42] * 8 and not errors
+    assert len(executions) == 1
+    metrics = flight.metrics()
+    assert metrics['executions'] == 1
+    assert metrics['coalesced_hits'] == 7
+    assert metrics['in_flight'] == 0
+
+def test_followers_receive_the_leaders_error():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('fit failed')
+
+    results, errors = _run_concurrently(flight, fail, started, release)
+
+    assert not results
+    assert len(errors) == 8 and all(str(e) == 'fit failed' for e in errors)
+    assert flight.metrics()['errors'] == 1
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    assert [flight.do('key', lambda n=n: n) for n in range(3)] == [0, 1, 2]
+    assert flight.metrics()['executions'] == 3
+
+def test_request_key_ignores_parameter_order():
+    assert (make_request_key('forecast', 1, {'country': 'Chile', 'days': 30}) ==
+            make_request_key('forecast', 1, {'days': 30, 'country': 'Chile'}))
+    assert make_request_key('forecast', 1) != make_request_key('forecast', 2)
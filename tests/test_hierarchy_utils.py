@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from hierarchy_utils import UNASSIGNED, RegionHierarchy
+from schema_utils import optimize_schema
+
+def _frame():
+    return pd.DataFrame({
+        'WHO Region': ['Europe', 'Europe', 'Europe', 'Americas', 'Americas', None],
+        'Country/Region': ['France', 'France', 'Italy', 'Chile', 'Peru', 'Diamond Princess'],
+        'Province/State': ['Paris', None, 'Lazio', None, 'Lima', None],
+        'Confirmed': [100, 50, 70, 30, 20, 5],
+        'Deaths': [10, 5, 7, 3, 2, 1]
+    })
+
+@pytest.fixture(params=['object', 'categorical'])
+def hierarchy(request):
+    df = _frame()
+    return RegionHierarchy(optimize_schema(df) if request.param == 'categorical' else df)
+
+def test_rollups_preserve_totals(hierarchy):
+    assert hierarchy.levels == ['WHO Region', 'Country/Region', 'Province/State']
+    assert int(hierarchy.total['Confirmed']) == 275
+    for level in hierarchy.levels:
+        assert int(hierarchy.rollup(level)['Confirmed'].sum()) == 275
+
+def test_nodes_and_children(hierarchy):
+    assert int(hierarchy.node(['Europe'])['Confirmed']) == 220
+    assert int(hierarchy.node(['Europe', 'France'])['Deaths']) == 15
+    assert int(hierarchy.node([UNASSIGNED])['Confirmed']) == 5
+
+    children = hierarchy.children(['Europe'])
+    assert sorted(hierarchy.label(key) for key in children.index) == ['France', 'Italy']
+    provinces = hierarchy.to_dict(hierarchy.children(['Europe', 'France']), ['Confirmed'])
+    assert provinces == {'France / Paris': {'Confirmed': 100}, f'France / {UNASSIGNED}': {'Confirmed': 50}}
+    assert hierarchy.parent(['Europe', 'France']) == ('Europe',)
+
+def test_leaves_have_no_children(hierarchy):
+    assert hierarchy.children(['Europe', 'France', 'Paris']).empty
+
+@pytest.mark.parametrize('path', [
+    ['Nowhere'],
+    ['Europe', 'Chile'],
+    ['Europe', 'France', 'Lyon'],
+    ['Europe', 'France', 'Paris', 'Extra']
+])
+def test_unknown_paths_raise_value_error(hierarchy, path):
+    with pytest.raises(ValueError):
+        hierarchy.children(path)
+    with pytest.raises(ValueError):
+        hierarchy.node(path)
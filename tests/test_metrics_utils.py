@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from metrics_utils import compute_epi_metrics, to_region_date_array
+
+def _records(null_day=None):
+    """Two regions with a steady 100 new cases a day for 60 days"""
+    dates = pd.date_range('2020-03-01', periods=60).strftime('%Y-%m-%d')
+    cumulative = 1000 + 100 * np.arange(1, 61, dtype='float64')
+    frames = []
+    for region in ['A', 'B']:
+        frame = pd.DataFrame({'Country/Region': region, 'Date': dates, 'Confirmed': cumulative})
+        if region == 'A' and null_day is not None:
+            frame.loc[null_day, 'Confirmed'] = None
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+def test_null_observation_stays_missing():
+    regions, dates, values = to_region_date_array(_records(null_day=30))
+    assert regions == ['A', 'B']
+    assert len(dates) == 60
+    assert np.isnan(values[0, 30])
+    assert np.isfinite(values).sum() == 119
+
+def test_null_observation_does_not_inflate_rt():
+    _, _, values = to_region_date_array(_records(null_day=30))
+    rt = compute_epi_metrics(values, None, window=7, serial_interval=4)['rt']
+    assert np.nanmax(np.abs(rt - 1.0)) < 1e-9
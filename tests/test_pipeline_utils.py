@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from coalescing_utils import SingleFlight
+from pipeline_utils import PipelineTask, PrecomputePipeline, order_tasks
+
+def _task(name, deps=(), priority=0, fn=None):
+    return PipelineTask(name, ('artifact', name), fn or (lambda: name), deps=deps, priority=priority)
+
+def _wait_until_done(pipeline, timeout=5):
+    deadline = time.monotonic() + timeout
+    while any(fields['status'] not in ('ready', 'failed')
+              for fields in pipeline.status()['artifacts'].values()):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_order_respects_dependencies_then_priority():
+    tasks = [
+        _task('figure', deps=['regional'], priority=0),
+        _task('clusters', priority=2),
+        _task('trends', priority=1),
+        _task('regional', priority=3)
+    ]
+
+    ordered = [task.name for task in order_tasks(tasks)]
+
+    assert ordered.index('regional') < ordered.index('figure')
+    assert ordered == ['trends', 'clusters', 'regional', 'figure']
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError, match='cycle'):
+        order_tasks([_task('a', deps=['b']), _task('b', deps=['a'])])
+    with pytest.raises(ValueError, match='Unknown'):
+        order_tasks([_task('a', deps=['missing'])])
+
+def test_artifacts_are_published_and_failures_recorded():
+    pipeline = PrecomputePipeline(SingleFlight(), max_workers=2)
+
+    def fail():
+        raise RuntimeError('no data')
+
+    pipeline.start(1, [_task('trends'), _task('broken', fn=fail), _task('figure', deps=['trends'])])
+    _wait_until_done(pipeline)
+
+    artifacts = pipeline.status()['artifacts']
+    assert artifacts['trends']['status'] == 'ready'
+    assert artifacts['figure']['status'] == 'ready'
+    assert artifacts['broken'] == dict(artifacts['broken'], status='failed', error='no data')
+    assert pipeline.fetch(1, ('artifact', 'trends'), lambda: 'recomputed') == 'trends'
+
+def test_stale_versions_are_discarded():
+    pipeline = PrecomputePipeline(SingleFlight(), max_workers=1)
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return 'old'
+
+    pipeline.start(1, [_task('slow', fn=slow)])
+    pipeline.start(2, [_task('fresh')])
+    release.set()
+    _wait_until_done(pipeline)
+
+    status = pipeline.status()
+    assert status['version'] == 2 and list(status['artifacts']) == ['fresh']
+    # A result computed for version 1 is returned to its caller but not published
+    assert pipeline.fetch(1, ('artifact', 'slow'), lambda: 'old') == 'old'
+    assert pipeline.fetch(2, ('artifact', 'slow'), lambda: 'new') == 'new'
+
+def test_unscheduled_results_are_bounded():
+    pipeline = PrecomputePipeline(SingleFlight(), max_workers=1, max_extra_results=3)
+    pipeline.start(1, [_task('trends')])
+    _wait_until_done(pipeline)
+
+    calls = []
+    for days in range(10):
+        pipeline.fetch(1, ('forecast', days), lambda days=days: calls.append(days) or days)
+    pipeline.fetch(1, ('forecast', 9), lambda: calls.append('again'))
+    pipeline.fetch(1, ('forecast', 0), lambda: calls.append('evicted'))
+
+    assert calls[-1] == 'evicted' and 'again' not in calls
+    assert pipeline.fetch(1, ('artifact', 'trends'), lambda: 'recomputed') == 'trends'
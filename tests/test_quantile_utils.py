@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from analytics_utils import analyze_vaccination_impact
+from quantile_utils import quantile_bin_stats
+
+def _frame(n=4000):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        'Vaccination Rate': rng.uniform(0, 100, n),
+        'New cases': rng.poisson(50, n),
+        'Deaths': rng.poisson(5, n),
+        'Recovery Rate': rng.uniform(0, 1, n)
+    })
+
+def test_tied_values_bin_the_same_way_in_both_paths():
+    data = _frame()
+    data.loc[:2399, 'Vaccination Rate'] = 0.0
+
+    exact = quantile_bin_stats(data, 'Vaccination Rate', ['New cases'])
+    sketch = quantile_bin_stats(data, 'Vaccination Rate', ['New cases'], exact_threshold=100)
+
+    assert exact['method'] == 'exact' and sketch['method'] == 'sketch'
+    assert exact['counts'] == sketch['counts'] == {label: 1000 for label in exact['counts']}
+    assert exact['edges'][:3] == [0.0, 0.0, 0.0]
+
+def test_missing_metric_columns_are_skipped():
+    data = _frame()
+    without_cases = analyze_vaccination_impact(data.drop(columns=['New cases']))
+    assert without_cases['vaccination_case_correlation'] is None
+    assert set(without_cases['quartile_statistics']) == {'Deaths', 'Recovery Rate'}
+
+    chunks = [data.drop(columns=['Recovery Rate']).iloc[start:start + 1000]
+              for start in range(0, len(data), 1000)]
+    chunked = analyze_vaccination_impact(chunks)
+    assert chunked['method'] == 'sketch'
+    assert set(chunked['quartile_statistics']) == {'New cases', 'Deaths'}
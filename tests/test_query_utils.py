@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_utils import build_dimension_indexes, iter_query, run_query
+from schema_utils import optimize_schema
+
+def _frame():
+    rng = np.random.default_rng(4)
+    n = 500
+    return pd.DataFrame({
+        'Country/Region': [f'Country {i % 50}' for i in range(n)],
+        'WHO Region': rng.choice(['Europe', 'Africa', 'Americas', 'Western Pacific'], n),
+        'Confirmed': rng.integers(0, 100000, n),
+        'Deaths': rng.integers(0, 1000, n)
+    })
+
+QUERY = {
+    'columns': ['Country/Region', 'Confirmed'],
+    'filters': {'WHO Region': ['Europe', 'Africa'], 'Confirmed': {'gte': 1000, 'lt': 50000}},
+    'sort': [{'column': 'Confirmed', 'ascending': False}],
+    'limit': 25
+}
+
+def _expected(df):
+    mask = df['WHO Region'].isin(['Europe', 'Africa']) & (df['Confirmed'] >= 1000) & (df['Confirmed'] < 50000)
+    result = df[mask].sort_values('Confirmed', ascending=False, kind='mergesort')
+    return int(mask.sum()), result[['Country/Region', 'Confirmed']].head(25)
+
+def test_predicates_match_pandas():
+    df = _frame()
+    matched, expected = _expected(df)
+
+    result = run_query(df, QUERY)
+
+    assert result['matched_rows'] == matched
+    assert result['row_count'] == len(expected)
+    assert result['data']['Confirmed'] == expected['Confirmed'].tolist()
+    assert result['data']['Country/Region'] == expected['Country/Region'].tolist()
+
+def test_index_path_matches_isin_path():
+    df = optimize_schema(_frame())
+    indexes = build_dimension_indexes(df)
+    assert 'WHO Region' in indexes
+
+    query = dict(QUERY, filters=dict(QUERY['filters'], **{'WHO Region': ['Europe', 'Africa', 'Nowhere']}))
+    assert run_query(df, query, indexes) == run_query(df, query)
+
+def test_streamed_batches_add_up_to_the_result():
+    df = _frame()
+    query = {'filters': {'WHO Region': 'Europe'}, 'columns': ['Confirmed']}
+
+    events = list(iter_query(df, query, batch_size=40))
+
+    assert events[0][0] == 'meta'
+    rows = [value for event, payload in events[1:] for value in payload['Confirmed']]
+    assert rows == run_query(df, query)['data']['Confirmed']
+
+@pytest.mark.parametrize('query', [
+    {'columns': 'Confirmed'},
+    {'columns': ['Nope']},
+    {'filters': [1]},
+    {'filters': {'Confirmed': {'between': 3}}},
+    {'sort': [{'ascending': False}]},
+    {'sort': 5},
+    {'limit': -3}
+])
+def test_malformed_queries_raise_value_error(query):
+    with pytest.raises(ValueError):
+        run_query(_frame(), query)
@@ -60,11 +60,28 @@ def create_global_cases_timeline(data):
     
     return fig
 
-def create_regional_comparison(data):
+def _regional_metrics_from_totals(regional_totals):
+    """Regional sums and rates in the layout of calculate_regional_metrics"""
+    regional_metrics = {('Confirmed', 'sum'): {}, ('Active', 'sum'): {},
+                        ('Additional', 'CFR'): {}, ('Additional', 'Recovery Rate'): {}}
+    for region, totals in regional_totals.items():
+        regional_metrics[('Confirmed', 'sum')][region] = totals['Confirmed']
+        regional_metrics[('Active', 'sum')][region] = totals['Active']
+        regional_metrics[('Additional', 'CFR')][region] = round(totals['Deaths'] / totals['Confirmed'] * 100, 2)
+        regional_metrics[('Additional', 'Recovery Rate')][region] = round(
+            totals['Recovered'] / totals['Confirmed'] * 100, 2
+        )
+    return regional_metrics
+
+def create_regional_comparison(data, regional_totals=None):
     """
     Create interactive regional comparison visualizations
+    Pass precomputed `regional_totals` ({region: {metric: sum}}) to skip regrouping the data
     """
-    regional_metrics = calculate_regional_metrics(data)
+    if regional_totals is None:
+        regional_metrics = calculate_regional_metrics(data)
+    else:
+        regional_metrics = _regional_metrics_from_totals(regional_totals)
     
     # Create subplots
     fig = make_subplots(
@@ -78,13 +95,13 @@ def create_regional_comparison(data):
     )
     
     # Add bar charts for each metric
-    regions = list(regional_metrics['Confirmed']['sum'].keys())
+    regions = list(regional_metrics[('Confirmed', 'sum')].keys())
     
     # Confirmed cases
     fig.add_trace(
         go.Bar(
             x=regions,
-            y=[regional_metrics['Confirmed']['sum'][region] for region in regions],
+            y=[regional_metrics[('Confirmed', 'sum')][region] for region in regions],
             name='Confirmed Cases',
             marker_color='#FF9F1C'
         ),
@@ -95,7 +112,7 @@ def create_regional_comparison(data):
     fig.add_trace(
         go.Bar(
             x=regions,
-            y=[regional_metrics['Additional']['CFR'][region] for region in regions],
+            y=[regional_metrics[('Additional', 'CFR')][region] for region in regions],
             name='CFR (%)',
             marker_color='#E71D36'
         ),
@@ -106,7 +123,7 @@ def create_regional_comparison(data):
     fig.add_trace(
         go.Bar(
             x=regions,
-            y=[regional_metrics['Additional']['Recovery Rate'][region] for region in regions],
+            y=[regional_metrics[('Additional', 'Recovery Rate')][region] for region in regions],
             name='Recovery Rate (%)',
             marker_color='#2EC4B6'
         ),
@@ -117,7 +134,7 @@ def create_regional_comparison(data):
     fig.add_trace(
         go.Bar(
             x=regions,
-            y=[regional_metrics['Active']['sum'][region] for region in regions],
+            y=[regional_metrics[('Active', 'sum')][region] for region in regions],
             name='Active Cases',
             marker_color='#011627'
         ),
@@ -134,11 +151,12 @@ def create_regional_comparison(data):
     
     return fig
 
-def create_vaccination_impact_dashboard(data):
+def create_vaccination_impact_dashboard(data, bins=4):
     """
     Create an interactive dashboard showing vaccination impact
+    Bin statistics come from the quantile binning engine; the input is not modified
     """
-    vax_impact = analyze_vaccination_impact(data)
+    vax_impact = analyze_vaccination_impact(data, bins=bins)
     
     if not vax_impact:
         return None
@@ -149,8 +167,8 @@ def create_vaccination_impact_dashboard(data):
         subplot_titles=(
             'Vaccination Rate vs New Cases',
             'Vaccination Rate vs Deaths',
-            'Cases by Vaccination Rate Quartile',
-            'Deaths by Vaccination Rate Quartile'
+            'Cases by Vaccination Rate Quantile',
+            'Deaths by Vaccination Rate Quantile'
         )
     )
     
@@ -300,7 +318,7 @@ def create_top_affected_countries_table(data):
     Create an interactive table showing top affected countries with key metrics
     """
     # Calculate metrics for each country
-    country_metrics = data.groupby('Country/Region').agg({
+    country_metrics = data.groupby('Country/Region', observed=True).agg({
         'Confirmed': 'sum',
         'Active': 'sum',
         'Recovered': 'sum',
@@ -312,9 +330,11 @@ def create_top_affected_countries_table(data):
     country_metrics['Death Rate'] = (country_metrics['Deaths'] / country_metrics['Confirmed'] * 100).round(1)
     
     # Calculate weekly change
-    previous_week = data.groupby('Country/Region')['Confirmed'].shift(7)
+    previous_week = data.groupby('Country/Region', observed=True)['Confirmed'].shift(7)
     weekly_change = ((data['Confirmed'] - previous_week) / previous_week * 100).round(1)
-    country_metrics['Weekly Change'] = weekly_change.groupby('Country/Region').last()
+    country_metrics['Weekly Change'] = country_metrics['Country/Region'].map(
+        weekly_change.groupby(data['Country/Region'], observed=True).last()
+    )
     
     # Sort by total cases descending
     country_metrics = country_metrics.sort_values('Confirmed', ascending=False)